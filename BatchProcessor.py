@@ -1,80 +1,47 @@
 import os
 import csv
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import re
-from datetime import datetime
-
-# Set tesseract path if needed (Windows)
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-# --- Extraction helpers ---
-def extract_vendor(text: str) -> str:
-    # First non-empty line as vendor
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    return lines[0] if lines else "Unknown"
-
-def extract_date(text: str) -> str:
-    text = clean_text_for_dates(text)
-    date_patterns = [
-            r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',   # 5/1/2014, 05-01-14
-            r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b'      # 2014-05-01
-            r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[ .-]?\d{1,2},?[ .-]?\d{2,4}\b',  # May 1, 2014
-        ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            raw_date = match.group(0)
-        
-            possible_formats = [
-                "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y",
-                    "%Y-%m-%d", "%Y/%m/%d",
-                    "%b %d %Y", "%B %d %Y",
-                    "%b %d, %Y", "%B %d, %Y",
-            ]
-
-            for fmt in possible_formats:
-                try:
-                    parsed = datetime.strptime(raw_date, fmt)
-                    return parsed.strftime("%Y-%m-%d")
-                except ValueError:
-                    continue
-    
-    return "Not found"
-
-def extract_total(text: str) -> str:
-
-    total_pattern = r'(?:TOTAL|Amount Due)[^\d]{0,10}(\d+[.,]\d{2})'
-
-    match = re.search(total_pattern, text, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    money_pattern = r'\$[\d,]+\.\d{2}'
-    money_matches = re.findall(money_pattern, text)
-    
-    if money_matches:
-        return money_matches[-1]
-    return "Not found"
-
-def clean_text_for_dates(text: str) -> str:
-    return(
-        text.replace("I", "1")
-            .replace("l", "1")
-            .replace("O", "0")
-    )
-
-def preprecess_image(image: Image.Image) -> Image.Image:
-    # Convert to Greyscale
-    image = image.convert("L")
-
-    return image
+from collections import deque
+from database import SessionLocal, Invoice
+from extractors import extract_date, extract_total, extract_vendor, preprocess_image
+from ocr import OCR_WORKERS, render_pdf, submit_page
 
 # --- Batch processing ---
+# Upper bound on pages queued on the OCR pool; each queued page image stays in memory until recognised
+MAX_PENDING_PAGES = 2 * OCR_WORKERS
+
+def _collect_invoice(filename, futures, results, records):
+    if futures is None:
+        results.append([filename, "ERROR", "ERROR", "ERROR"])
+        return
+
+    try:
+        text = "\n".join(future.result() for future in futures)
+
+        vendor, _ = extract_vendor(text)
+        date = extract_date(text)
+        total, _ = extract_total(text)
+
+        results.append([filename, vendor, date, total])
+        records.append(Invoice(
+            filename=filename,
+            vendor=vendor,
+            date=date,
+            total=total,
+            extracted_text=text.strip()
+        ))
+
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+        results.append([filename, "ERROR", "ERROR", "ERROR"])
+
 def process_invoices(folder: str, output_csv: str = "results.csv"):
+    # Rasterize each PDF and queue its pages on the OCR pool straight away, so
+    # pages from several files are recognised in parallel while later files load.
+    # Once too many pages are queued, finish the oldest files before loading more.
     results = []
+    records = []
+    pending = deque()
+    pending_pages = 0
     for filename in os.listdir(folder):
         if not filename.lower().endswith(".pdf"):
             continue
@@ -83,20 +50,21 @@ def process_invoices(folder: str, output_csv: str = "results.csv"):
         print(f"Processing: {filename}")
 
         try:
-            images = convert_from_path(filepath)
-            text = ""
-            for i, img in enumerate(images):
-                text += pytesseract.image_to_string(img, config="--psm 6") + "\n"
-
-            vendor = extract_vendor(text)
-            date = extract_date(text)
-            total = extract_total(text)
-
-            results.append([filename, vendor, date, total])
-
+            pages = [preprocess_image(img) for img in render_pdf(filepath)]
+            futures = [submit_page(page) for page in pages if page is not None]
         except Exception as e:
             print(f"Error processing {filename}: {e}")
-            results.append([filename, "ERROR", "ERROR", "ERROR"])
+            futures = None
+
+        pending.append((filename, futures))
+        pending_pages += len(futures or ())
+        while pending_pages > MAX_PENDING_PAGES:
+            done_filename, done_futures = pending.popleft()
+            pending_pages -= len(done_futures or ())
+            _collect_invoice(done_filename, done_futures, results, records)
+
+    while pending:
+        _collect_invoice(*pending.popleft(), results, records)
 
     # Save to CSV
     with open(output_csv, "w", newline="", encoding="utf-8") as f:
@@ -104,7 +72,12 @@ def process_invoices(folder: str, output_csv: str = "results.csv"):
         writer.writerow(["Filename", "Vendor", "Date", "Total"])
         writer.writerows(results)
 
-    print(f"✅ Finished! Results saved to {output_csv}")
+    # Save to DB in a single transaction
+    with SessionLocal() as db:
+        db.bulk_save_objects(records)
+        db.commit()
+
+    print(f"✅ Finished! Results saved to {output_csv} and {len(records)} invoices stored")
 
 
 if __name__ == "__main__":
@@ -1,22 +1,35 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, sessionmaker
 from datetime import datetime
 
 DATABASE_URL = "sqlite:///./invoices.db"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _):
+        # WAL lets concurrent /parse writes proceed alongside readers; NORMAL sync is safe under WAL
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 SessionLocal = sessionmaker(bind=engine, autoflush=False)
 Base = declarative_base()
 
 class Invoice(Base):
     __tablename__ = "invoices"
     id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String)
+    filename = Column(String, index=True)
     vendor = Column(String)
     date = Column(String)
     total = Column(String)
-    extracted_text = Column(Text)
+    # Full OCR output can be large; only load it when a caller asks for it
+    extracted_text = deferred(Column(Text))
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
 Base.metadata.create_all(bind=engine)
+# create_all skips existing tables, so add any indexes an older database is missing
+for index in Invoice.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,294 @@
+import re
+import re2
+import string
+from datetime import datetime
+from typing import Optional, Tuple, List
+import numpy as np
+from numba import njit
+from PIL import Image
+
+# -----------------------------
+# TEXT CLEANING
+# -----------------------------
+
+# Common OCR confusions in numeric dates, fixed in a single pass
+_DATE_TABLE = str.maketrans({"I": "1", "l": "1", "O": "0"})
+
+def clean_text_for_dates(text: str) -> str:
+    return text.translate(_DATE_TABLE)
+
+def clean_ocr_text(text: str) -> str:
+    if not text:
+        return ""
+    s = text.replace('\r', '\n')
+    return s
+
+# -----------------------------
+# DATE EXTRACTION
+# -----------------------------
+
+# One alternation so the text is scanned once; the outer group names which
+# format matched (match.lastgroup) and prefix the inner y/m/d groups.
+_DATE_RE = re.compile(
+    r'(?P<slash>\b(?P<slash_m>\d{1,2})[/-](?P<slash_d>\d{1,2})[/-](?P<slash_y>\d{2,4})\b)'  # 5/1/2014, 05-01-14
+    r'|(?P<iso>\b(?P<iso_y>\d{4})[/-](?P<iso_m>\d{1,2})[/-](?P<iso_d>\d{1,2})\b)'  # 2014-05-01
+    r'|(?P<mon>\b(?P<mon_name>Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?'
+    r'|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?) (?P<mon_d>\d{1,2}),? (?P<mon_y>\d{4})\b)',  # May 1, 2014
+    re.IGNORECASE,
+)
+_DIGIT_RE = re.compile(r'\d')
+_MONTHS = {
+    name: i for i, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+
+def _date_from_match(match: re.Match) -> Optional[str]:
+    kind = match.lastgroup
+    if kind != "mon":
+        # Numeric dates must use one separator throughout (5/1/2014, not 5/1-2014)
+        raw = match.group(kind)
+        if ("/" in raw) == ("-" in raw):
+            return None
+    raw_year = match.group(f"{kind}_y")
+    if len(raw_year) == 4:
+        year = int(raw_year)
+    elif len(raw_year) == 2:
+        # Same pivot as strptime's %y: 00-68 -> 20xx, 69-99 -> 19xx
+        year = int(raw_year) + (2000 if int(raw_year) < 69 else 1900)
+    else:
+        return None
+
+    if kind == "mon":
+        month = _MONTHS[match.group("mon_name")[:3].lower()]
+    else:
+        month = int(match.group(f"{kind}_m"))
+    try:
+        return datetime(year, month, int(match.group(f"{kind}_d"))).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+def extract_date(text: str) -> str:
+    text = clean_text_for_dates(text)
+
+    # Every date pattern needs a digit, so pages without one can bail out early
+    if not _DIGIT_RE.search(text):
+        return "Not found"
+
+    for match in _DATE_RE.finditer(text):
+        parsed = _date_from_match(match)
+        if parsed:
+            return parsed
+    return "Not found"
+
+# -----------------------------
+# VENDOR EXTRACTION (Improved)
+# -----------------------------
+
+VENDOR_SKIP_KEYWORDS = re.compile(
+    r'^(invoice|invoice no|invoice #|invoice number|date|due|page|total|tax|phone|tel|fax|bill to|ship to|amount|balance|subtotal|description|item|quantity|qty|account|address|order|ship|email|page)',
+    re.IGNORECASE
+)
+COMPANY_HINTS = re.compile(r'\b(inc|llc|ltd|co|corp|corporation|company|gmbh|plc)\b', re.IGNORECASE)
+
+_NUM_ONLY_RE = re.compile(r'^[\d\W]{1,}$')
+# Counting by deleting characters keeps the per-line tallies in C
+_DEL_LETTERS = str.maketrans('', '', string.ascii_letters)
+_DEL_DIGITS = str.maketrans('', '', string.digits)
+
+def extract_vendor(text: str, top_n_lines: int = 8) -> Tuple[str, List[str]]:
+    text = clean_ocr_text(text)
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    candidates = []
+
+    for i, line in enumerate(lines[:top_n_lines]):
+        lc = line.lower()
+        if VENDOR_SKIP_KEYWORDS.search(lc):
+            continue
+        if _NUM_ONLY_RE.match(line):
+            continue
+        if '@' in line or 'http' in line or 'www' in line:
+            continue
+
+        score = 0
+        if COMPANY_HINTS.search(line):
+            score += 5
+        if 1 < len(line.split()) <= 6:
+            score += 2
+        letters = len(line) - len(line.translate(_DEL_LETTERS))
+        digits = len(line) - len(line.translate(_DEL_DIGITS))
+        if letters > digits:
+            score += 1
+
+        candidates.append((score, i, line))
+
+    if candidates:
+        candidates.sort(key=lambda x: (-x[0], x[1]))
+        chosen = candidates[0][2]
+        return chosen, [c[2] for c in candidates]
+
+    return (lines[0] if lines else "Unknown"), []
+
+# -----------------------------
+# TOTAL EXTRACTION (Improved)
+# -----------------------------
+
+# Bare "total" stays last so the longer phrases are preferred when they match
+TOTAL_KEYWORDS = r'(?:grand\s+total|total\s+due|amount\s+due|balance\s+due|amount\s+payable|net\s+total|invoice\s+total|total\s+amount|total)'
+MONEY_PATTERN = r'[\$]?\s*\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})'
+TOTAL_GAP_MAX_CHARS = 40
+# Every keyword contains one of these, so text without them can skip the keyword regex
+_TOTAL_HINTS = ("total", "amount", "balance")
+
+def _compile_linear(pattern: str):
+    # RE2 matches in linear time, so noisy OCR text can't trigger catastrophic backtracking
+    try:
+        return re2.compile(pattern)
+    except re2.error:
+        return re.compile(pattern)
+
+def _compile_total_regex(gap_max_chars: int):
+    # Keywords start on a word boundary (so 'Subtotal' isn't 'total'), and the gap
+    # between keyword and amount never crosses a line break
+    return _compile_linear(rf'(?i)\b{TOTAL_KEYWORDS}[^\n\d]{{0,{gap_max_chars}}}({MONEY_PATTERN})')
+
+_TOTAL_RE = _compile_total_regex(TOTAL_GAP_MAX_CHARS)
+_MONEY_RE = _compile_linear(MONEY_PATTERN)
+_AMT_STRIP_RE = re.compile(r'[^\d,.\-]')
+
+def parse_amount_to_float(amount_str: str) -> Optional[float]:
+    if not amount_str:
+        return None
+    s = _AMT_STRIP_RE.sub('', amount_str.strip())
+    if s == '':
+        return None
+    if s.count(',') > 0 and s.count('.') > 0:
+        if s.rfind(',') > s.rfind('.'):
+            s = s.replace('.', '').replace(',', '.')
+        else:
+            s = s.replace(',', '')
+    elif s.count(',') > 0 and s.count('.') == 0:
+        if len(s.split(',')[-1]) == 2:
+            s = s.replace(',', '.')
+        else:
+            s = s.replace(',', '')
+    try:
+        return float(s)
+    except Exception:
+        return None
+
+def extract_total(text: str, gap_max_chars: int = TOTAL_GAP_MAX_CHARS) -> Tuple[str, List[str]]:
+    text = clean_ocr_text(text)
+    debug_candidates = []
+
+    lowered = text.lower()
+    match = None
+    if any(hint in lowered for hint in _TOTAL_HINTS):
+        regex = _TOTAL_RE if gap_max_chars == TOTAL_GAP_MAX_CHARS else _compile_total_regex(gap_max_chars)
+        match = regex.search(text)
+
+    if match:
+        amt_raw = match.group(1)
+        parsed = parse_amount_to_float(amt_raw)
+        debug_candidates.append(amt_raw)
+        if parsed is not None:
+            return f"{parsed:.2f}", debug_candidates
+
+    money_matches = _MONEY_RE.findall(text)
+    debug_candidates.extend(money_matches)
+    if money_matches:
+        parsed_list = [parse_amount_to_float(m) for m in money_matches if parse_amount_to_float(m) is not None]
+        if parsed_list:
+            return f"{max(parsed_list):.2f}", debug_candidates
+    return "Not found", debug_candidates
+
+# -----------------------------
+# IMAGE PREPROCESSING
+# -----------------------------
+
+_LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Pages with fewer dark pixels than this after binarization are treated as blank
+BLANK_PAGE_INK_RATIO = 0.0002
+# Pages whose Otsu classes are closer than this many grey levels hold only paper
+# noise (a blank scan), not ink on paper, and are treated as blank too
+MIN_PAGE_CONTRAST = 40
+
+def to_grayscale(image: Image.Image) -> np.ndarray:
+    if image.mode == "L":
+        return np.asarray(image)
+    if image.mode != "RGB":
+        return np.asarray(image.convert("L"))  # grayscale (palette, RGBA, CMYK, ...)
+    # RGB -> luma as one vectorized dot product over the pixel buffer
+    gray = np.asarray(image, dtype=np.float32) @ _LUMA_WEIGHTS
+    return gray.astype(np.uint8)
+
+@njit(cache=True)
+def _otsu_split(flat: np.ndarray):
+    # Returns the threshold and the gap between the two class means
+    # Histogram in a single sequential pass; a prange histogram would race on the bins
+    hist = np.zeros(256, np.int64)
+    for i in range(flat.size):
+        hist[flat[i]] += 1
+
+    total = flat.size
+    mu_total = 0.0
+    for t in range(256):
+        mu_total += t * hist[t]
+
+    w0 = 0.0
+    mu = 0.0
+    best_var = 0.0
+    best_t = 0
+    best_gap = 0.0
+    for t in range(256):
+        w0 += hist[t]
+        mu += t * hist[t]
+        w1 = total - w0
+        if w0 == 0 or w1 == 0:
+            continue
+        between_var = (mu_total * w0 - mu * total) ** 2 / (w0 * w1)
+        if between_var > best_var:
+            best_var = between_var
+            best_t = t
+            best_gap = (mu_total - mu) / w1 - mu / w0
+    return best_t, best_gap
+
+# Deliberately not parallel=True: Numba's threading layer (TBB in particular) can
+# deadlock once the OCR process pool forks, and pages are already parallel per worker
+@njit(cache=True)
+def _binarize(gray: np.ndarray, threshold: int):
+    binary = np.empty(gray.shape, np.uint8)
+    ink = 0
+    for i in range(gray.shape[0]):
+        for j in range(gray.shape[1]):
+            if gray[i, j] > threshold:
+                binary[i, j] = 255
+            else:
+                binary[i, j] = 0
+                ink += 1
+    return binary, ink
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Otsu's threshold: the grey level maximising between-class variance."""
+    return int(_otsu_split(np.ascontiguousarray(gray).ravel())[0])
+
+def preprocess_image(image: Image.Image) -> Optional[Image.Image]:
+    """Grayscale and Otsu-binarize a page for Tesseract.
+
+    Returns None when the page is blank so callers can skip OCR for it.
+    """
+    gray = np.ascontiguousarray(to_grayscale(image))
+    if gray.size == 0:
+        return None
+    threshold, gap = _otsu_split(gray.ravel())
+    if gap < MIN_PAGE_CONTRAST:
+        return None
+    binary, ink = _binarize(gray, threshold)
+    if ink < BLANK_PAGE_INK_RATIO * gray.size:
+        return None
+    return Image.fromarray(binary, "L")
+
+def warm_up_preprocessing() -> None:
+    """Compile (or load from cache) the JIT kernels outside the request path."""
+    preprocess_image(Image.new("L", (8, 8)))
@@ -1,14 +1,15 @@
-from fastapi import FastAPI, UploadFile, File, Request
+from fastapi import FastAPI, UploadFile, File, Query, Request
 from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
-import pytesseract
+from fastapi.concurrency import run_in_threadpool
 from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
 import io
-import re
-from datetime import datetime
-from pdf2image import convert_from_bytes
-from typing import Optional, Tuple, List
+from typing import BinaryIO, List, Optional, Tuple
 from database import SessionLocal, Invoice
+from extractors import extract_date, extract_total, extract_vendor, preprocess_image, warm_up_preprocessing
+from ocr import ocr_pages, render_pdf, shutdown_ocr_pool, start_ocr_pool, PSM
 import os
 from dotenv import load_dotenv
 
@@ -48,6 +49,20 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# -----------------------------
+# LIFECYCLE
+# -----------------------------
+
+@app.on_event("startup")
+def load_ocr_workers():
+    # Pay Tesseract's model load and the preprocessing JIT compile at boot instead of on the first /parse
+    warm_up_preprocessing()
+    start_ocr_pool()
+
+@app.on_event("shutdown")
+def stop_ocr_workers():
+    shutdown_ocr_pool()
+
 # -----------------------------
 # MIDDLEWARE
 # -----------------------------
@@ -78,24 +93,27 @@ async def require_api_key(request: Request, call_next):
 def ping():
     return {"status": "ok", "message": "API is running"}
 
+def _load_pages(upload: BinaryIO, is_pdf: bool) -> Tuple[int, List[Optional[Image.Image]]]:
+    """Measure, rasterize and preprocess an upload; blocking, so run it off the event loop."""
+    upload.seek(0, io.SEEK_END)
+    size_bytes = upload.tell()
+    upload.seek(0)
+    if is_pdf:
+        # Convert PDF to images
+        return size_bytes, [preprocess_image(img) for img in render_pdf(upload)]
+    return size_bytes, [preprocess_image(Image.open(upload))]
+
 @app.post("/parse")
 async def parse_document(file: UploadFile = File(...)):
-    content = await file.read()
+    is_pdf = file.filename.lower().endswith(".pdf")
     extracted_text = ""
 
     try:
-        if file.filename.lower().endswith(".pdf"):
-            # Convert PDF to images
-            images = convert_from_bytes(content)
-            for i, img in enumerate(images):
-                extracted_text += f"\n--- Page {i + 1} ---\n"
-                extracted_text += pytesseract.image_to_string(img, config="--oem 3 --psm 4")
-        else:
-            image = Image.open(io.BytesIO(content))
-            image = preprocess_image(image)
-            extracted_text = pytesseract.image_to_string(image, config="--oem 3 --psm 6")
-
-        extracted_text = strip_page_markers(extracted_text)
+        # Starlette already spools uploads to a temp file; read from it in place
+        # instead of buffering the whole document in memory.
+        size_bytes, images = await run_in_threadpool(_load_pages, file.file, is_pdf)
+        page_texts = await ocr_pages(images, psm=PSM.SINGLE_COLUMN if is_pdf else PSM.SINGLE_BLOCK)
+        extracted_text = "\n".join(page_texts)
 
         # 🔹 Updated extraction functions
         vendor, vendor_candidates = extract_vendor(extracted_text)
@@ -122,7 +140,7 @@ async def parse_document(file: UploadFile = File(...)):
 
     return JSONResponse({
         "filename": file.filename,
-        "size_bytes": len(content),
+        "size_bytes": size_bytes,
         "vendor": vendor,
         "vendor_candidates": vendor_candidates,
         "date": date,
@@ -133,9 +151,15 @@ async def parse_document(file: UploadFile = File(...)):
 
 
 @app.get("/invoices")
-def get_invoices():
+def get_invoices(limit: int = Query(100, ge=1, le=500), offset: int = Query(0, ge=0)):
     db = SessionLocal()
-    rows = db.query(Invoice).all()
+    # Select only the summary columns so extracted_text is never loaded
+    rows = db.execute(
+        select(Invoice.id, Invoice.filename, Invoice.vendor, Invoice.date, Invoice.total)
+        .order_by(Invoice.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
     db.close()
     return [
         {
@@ -151,7 +175,7 @@ def get_invoices():
 @app.get("/invoices/{invoice_id}")
 def get_invoice(invoice_id: int):
     db = SessionLocal()
-    record = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    record = db.get(Invoice, invoice_id, options=[undefer(Invoice.extracted_text)])
     db.close()
 
     if not record:
@@ -165,151 +189,3 @@ def get_invoice(invoice_id: int):
         "total": record.total,
         "extracted_text": record.extracted_text
     }
-
-
-# -----------------------------
-# TEXT CLEANING & PREPROCESSING
-# -----------------------------
-
-def preprocess_image(image: Image.Image) -> Image.Image:
-    image = image.convert("L")  # grayscale
-    return image
-
-def clean_text_for_dates(text: str) -> str:
-    return (
-        text.replace("I", "1")
-            .replace("l", "1")
-            .replace("O", "0")
-    )
-
-def clean_ocr_text(text: str) -> str:
-    if not text:
-        return ""
-    s = text.replace('\r', '\n')
-    return s
-
-# -----------------------------
-# DATE EXTRACTION (Your version + fix)
-# -----------------------------
-
-def extract_date(text: str) -> str:
-    text = clean_text_for_dates(text)
-    date_patterns = [
-        r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',  # 5/1/2014, 05-01-14
-        r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',    # 2014-05-01
-        r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[ .-]?\d{1,2},?[ .-]?\d{2,4}\b',  # May 1, 2014
-    ]
-
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            raw_date = match.group(0)
-            possible_formats = [
-                "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y",
-                "%Y-%m-%d", "%Y/%m/%d",
-                "%b %d %Y", "%B %d %Y",
-                "%b %d, %Y", "%B %d, %Y",
-            ]
-            for fmt in possible_formats:
-                try:
-                    parsed = datetime.strptime(raw_date, fmt)
-                    return parsed.strftime("%Y-%m-%d")
-                except ValueError:
-                    continue
-    return "Not found"
-
-# -----------------------------
-# VENDOR EXTRACTION (Improved)
-# -----------------------------
-
-VENDOR_SKIP_KEYWORDS = re.compile(
-    r'^(invoice|invoice no|invoice #|invoice number|date|due|page|total|tax|phone|tel|fax|bill to|ship to|amount|balance|subtotal|description|item|quantity|qty|account|address|order|ship|email|page)',
-    re.IGNORECASE
-)
-COMPANY_HINTS = re.compile(r'\b(inc|llc|ltd|co|corp|corporation|company|gmbh|plc)\b', re.IGNORECASE)
-
-def strip_page_markers(text: str) -> str:
-    """Remove artificial page headers like --- Page 1 --- added during PDF conversion."""
-    return re.sub(r'\n?-{2,}\s*Page\s*\d+\s*-{2,}\n?', '\n', text, flags=re.IGNORECASE)
-
-def extract_vendor(text: str, top_n_lines: int = 8) -> Tuple[str, List[str]]:
-    text = clean_ocr_text(text)
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    candidates = []
-
-    for i, line in enumerate(lines[:top_n_lines]):
-        lc = line.lower()
-        if VENDOR_SKIP_KEYWORDS.search(lc):
-            continue
-        if re.match(r'^[\d\W]{1,}$', line):
-            continue
-        if '@' in line or 'http' in line or 'www' in line:
-            continue
-
-        score = 0
-        if COMPANY_HINTS.search(line):
-            score += 5
-        if 1 < len(line.split()) <= 6:
-            score += 2
-        letters = sum(c.isalpha() for c in line)
-        digits = sum(c.isdigit() for c in line)
-        if letters > digits:
-            score += 1
-
-        candidates.append((score, i, line))
-
-    if candidates:
-        candidates.sort(key=lambda x: (-x[0], x[1]))
-        chosen = candidates[0][2]
-        return chosen, [c[2] for c in candidates]
-
-    return (lines[0] if lines else "Unknown"), []
-
-# -----------------------------
-# TOTAL EXTRACTION (Improved)
-# -----------------------------
-
-TOTAL_KEYWORDS = r'(?:grand total|total due|amount due|balance due|amount payable|net total|invoice total|total amount|total)'
-MONEY_PATTERN = r'[\$]?\s*\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})'
-
-def parse_amount_to_float(amount_str: str) -> Optional[float]:
-    if not amount_str:
-        return None
-    s = re.sub(r'[^\d,.\-]', '', amount_str.strip())
-    if s == '':
-        return None
-    if s.count(',') > 0 and s.count('.') > 0:
-        if s.rfind(',') > s.rfind('.'):
-            s = s.replace('.', '').replace(',', '.')
-        else:
-            s = s.replace(',', '')
-    elif s.count(',') > 0 and s.count('.') == 0:
-        if len(s.split(',')[-1]) == 2:
-            s = s.replace(',', '.')
-        else:
-            s = s.replace(',', '')
-    try:
-        return float(s)
-    except Exception:
-        return None
-
-def extract_total(text: str, gap_max_chars: int = 80) -> Tuple[str, List[str]]:
-    text = clean_ocr_text(text)
-    regex = re.compile(rf'{TOTAL_KEYWORDS}[^\d]{{0,{gap_max_chars}}}({MONEY_PATTERN})', re.IGNORECASE | re.DOTALL)
-    match = regex.search(text)
-    debug_candidates = []
-
-    if match:
-        amt_raw = match.group(1)
-        parsed = parse_amount_to_float(amt_raw)
-        debug_candidates.append(amt_raw)
-        if parsed is not None:
-            return f"{parsed:.2f}", debug_candidates
-
-    money_matches = re.findall(MONEY_PATTERN, text)
-    debug_candidates.extend(money_matches)
-    if money_matches:
-        parsed_list = [parse_amount_to_float(m) for m in money_matches if parse_amount_to_float(m) is not None]
-        if parsed_list:
-            return f"{max(parsed_list):.2f}", debug_candidates
-    return "Not found", debug_candidates
@@ -0,0 +1,115 @@
+import os
+
+# Keep each Tesseract instance single-threaded so parallel workers don't oversubscribe cores.
+# Must be set before tesserocr loads libtesseract.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Iterable, List, Optional, Union
+import pypdfium2 as pdfium
+from PIL import Image
+from tesserocr import PyTessBaseAPI, PSM, OEM
+
+# pdfium renders at 72 dpi per unit of scale; match pdf2image's 200 dpi default
+PDF_RENDER_SCALE = 200 / 72
+
+OCR_WORKERS = os.cpu_count() or 1
+
+# Seconds start_ocr_pool waits for every worker to finish loading Tesseract
+WARM_UP_TIMEOUT = 120
+
+# One API per worker process so the language model is only loaded once per worker
+_TESS_API: Optional[PyTessBaseAPI] = None
+_WARM_UP_BARRIER = None
+_OCR_POOL: Optional[ProcessPoolExecutor] = None
+
+def _init_tess(warm_up_barrier) -> None:
+    global _TESS_API, _WARM_UP_BARRIER
+    _TESS_API = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+    _WARM_UP_BARRIER = warm_up_barrier
+
+def _ocr_page(image: Image.Image, psm: int = PSM.SINGLE_BLOCK) -> str:
+    _TESS_API.SetPageSegMode(psm)
+    _TESS_API.SetImage(image)
+    return _TESS_API.GetUTF8Text()
+
+def _warm_up() -> int:
+    # Runs after the initializer; blocks until every worker has reached this point
+    _WARM_UP_BARRIER.wait(timeout=WARM_UP_TIMEOUT)
+    return os.getpid()
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    global _OCR_POOL
+    if _OCR_POOL is None:
+        _OCR_POOL = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            initializer=_init_tess,
+            initargs=(multiprocessing.Barrier(OCR_WORKERS),),
+        )
+    return _OCR_POOL
+
+def start_ocr_pool() -> ProcessPoolExecutor:
+    """Create the OCR pool and load Tesseract in every worker before the first request."""
+    pool = get_ocr_pool()
+    # Each warm-up task waits on a barrier sized to the pool, so no worker can take
+    # two of them: all OCR_WORKERS workers must spawn and finish their initializer
+    for future in [pool.submit(_warm_up) for _ in range(OCR_WORKERS)]:
+        future.result()
+    return pool
+
+def _discard_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    # A worker died (e.g. libtesseract crashed or was OOM-killed), which breaks the
+    # whole executor; drop it so the next call builds a fresh pool.
+    global _OCR_POOL
+    if _OCR_POOL is pool:
+        _OCR_POOL = None
+    pool.shutdown(wait=False)
+
+def shutdown_ocr_pool() -> None:
+    global _OCR_POOL
+    if _OCR_POOL is not None:
+        _OCR_POOL.shutdown()
+        _OCR_POOL = None
+
+def submit_page(image: Image.Image, psm: int = PSM.SINGLE_BLOCK) -> Future:
+    pool = get_ocr_pool()
+    try:
+        return pool.submit(_ocr_page, image, psm)
+    except BrokenProcessPool:
+        _discard_ocr_pool(pool)
+        return get_ocr_pool().submit(_ocr_page, image, psm)
+
+async def ocr_pages(images: Iterable[Optional[Image.Image]], psm: int = PSM.SINGLE_BLOCK) -> List[str]:
+    """OCR pages across the worker pool, returning their text in page order.
+
+    Awaits the workers without blocking the event loop. None entries (pages
+    already known to be blank) are not sent to Tesseract and come back as
+    empty strings.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_ocr_pool()
+    images = list(images)
+    try:
+        texts = iter(await asyncio.gather(*(
+            loop.run_in_executor(pool, _ocr_page, img, psm) for img in images if img is not None
+        )))
+    except BrokenProcessPool:
+        # Only this request fails; the next one gets a fresh pool
+        _discard_ocr_pool(pool)
+        raise
+    return ["" if img is None else next(texts) for img in images]
+
+def render_pdf(source: Union[str, bytes, BinaryIO]) -> List[Image.Image]:
+    """Rasterize every page of a PDF in-process, without poppler or temp files.
+
+    Pages are rendered straight to 8-bit grayscale, so no RGB buffer is allocated
+    and the images need no further conversion before OCR.
+    """
+    pdf = pdfium.PdfDocument(source)
+    try:
+        return [page.render(scale=PDF_RENDER_SCALE, grayscale=True).to_pil() for page in pdf]
+    finally:
+        pdf.close()
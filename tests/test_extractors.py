@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from extractors import extract_date, extract_total, preprocess_image
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Date: 5/1/2014", "2014-05-01"),
+    ("05-01-14", "2014-05-01"),
+    ("2014/05/01", "2014-05-01"),
+    ("Invoice MAY 12, 2014", "2014-05-12"),
+    ("December 3 2020", "2020-12-03"),
+    ("no date here", "Not found"),
+])
+def test_extract_date_formats(text, expected):
+    assert extract_date(text) == expected
+
+
+@pytest.mark.parametrize("text", ["5/1-2014", "2014-05/01", "May-1-14"])
+def test_extract_date_rejects_mixed_separators(text):
+    assert extract_date(text) == "Not found"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1/1/68", "2068-01-01"),
+    ("1/1/69", "1969-01-01"),
+])
+def test_extract_date_two_digit_year_pivot(text, expected):
+    # Same pivot as strptime's %y
+    assert extract_date(text) == expected
+
+
+@pytest.mark.parametrize("text", ["Dec 2020", "Statement Dec 2020", "Jun 2023 statement", "Marketing 12 2020"])
+def test_extract_date_rejects_partial_month_name_dates(text):
+    assert extract_date(text) == "Not found"
+
+
+def test_extract_date_skips_invalid_match():
+    assert extract_date("13/45/2020 then 5/1/2014") == "2014-05-01"
+
+
+def test_extract_date_takes_first_date_in_reading_order():
+    # The ISO date comes first on the page, so it wins over the later slash date
+    assert extract_date("Issued 2020-02-03, due 5/1/2014") == "2020-02-03"
+
+
+def test_preprocess_image_treats_white_page_as_blank():
+    assert preprocess_image(Image.new("L", (64, 64), 255)) is None
+
+
+def test_preprocess_image_treats_low_contrast_noise_as_blank():
+    # A scanned blank page: paper noise only, no ink
+    noise = np.random.default_rng(0).integers(235, 256, (64, 64), dtype=np.uint8)
+    assert preprocess_image(Image.fromarray(noise)) is None
+
+
+def test_preprocess_image_binarizes_ink_on_paper():
+    page = np.full((64, 64), 245, np.uint8)
+    page[20:30, 10:50] = 30
+    binary = np.asarray(preprocess_image(Image.fromarray(page)))
+    assert set(np.unique(binary)) == {0, 255}
+    assert binary[25, 25] == 0 and binary[0, 0] == 255
+
+
+def test_extract_total_ignores_subtotal():
+    assert extract_total("Subtotal 10.00 Total 12.00")[0] == "12.00"
+
+
+def test_extract_total_custom_gap_ignores_subtotal():
+    assert extract_total("Subtotal 10.00 Total 12.00", gap_max_chars=5)[0] == "12.00"